@@ -2,8 +2,11 @@
 
 import logging
 import os
+import random
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from http import HTTPStatus
 
 import requests
@@ -19,14 +22,38 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 
 RETRY_PERIOD = 600
+MAX_RETRY_PERIOD = 3600
+REQUEST_TIMEOUT = (5, 30)
+MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = '\n\n'
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+VALIDATOR_HEADERS = {
+    'ETag': 'If-None-Match',
+    'Last-Modified': 'If-Modified-Since',
+}
 
 HOMEWORK_VERDICTS = {
     'approved': 'Работа проверена: ревьюеру всё понравилось. Ура!',
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+_HOMEWORK_FORMATTERS = {
+    status: ('Изменился статус проверки работы "{0}". ' + verdict).format
+    for status, verdict in HOMEWORK_VERDICTS.items()
+}
+_get_formatter = _HOMEWORK_FORMATTERS.get
+
+_MISSING = object()
+
+# Оповещения об ошибках отправляются в отдельном потоке и не ожидаются,
+# чтобы задержки Telegram не задерживали опрос API. Статусы работ
+# отправляются напрямую: от их доставки зависит сдвиг временной метки,
+# а вызов ограничен тайм-аутами самого telebot.
+_ALERT_EXECUTOR = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix='telegram-alert'
+)
 
 
 def send_message(bot, message):
@@ -40,7 +67,7 @@ def send_message(bot, message):
         bool: True если сообщение отправлено успешно, False при ошибке
     """
     try:
-        logging.debug(f'Попытка отправить сообщение: {message}')
+        logging.debug('Попытка отправить сообщение: %s', message)
         bot.send_message(TELEGRAM_CHAT_ID, message)
         logging.debug('Сообщение успешно отправлено')
         return True
@@ -61,21 +88,44 @@ def get_api_answer(timestamp):
     Returns:
         dict: Ответ API в формате JSON
 
+    Raises:
+        ConnectionError: Ошибка соединения с API
+        ValueError: Некорректный статус ответа
+    """
+    answer, _ = get_conditional_api_answer(timestamp, None)
+    return answer
+
+
+def get_conditional_api_answer(timestamp, validators):
+    """Делает условный запрос к API Практикум.Домашка.
+
+    Args:
+        timestamp: Временная метка для запроса
+        validators: Заголовки If-None-Match и If-Modified-Since из
+            обработанного ответа с той же временной меткой или None
+
+    Returns:
+        tuple: Ответ API в формате JSON или None, если данные не
+        изменились, и заголовки условного запроса для следующего опроса
+
     Raises:
         ConnectionError: Ошибка соединения с API
         ValueError: Некорректный статус ответа
     """
     request_params = {
         'url': ENDPOINT,
-        'headers': HEADERS,
+        'headers': {**HEADERS, **validators} if validators else HEADERS,
         'params': {'from_date': timestamp},
+        'timeout': REQUEST_TIMEOUT,
     }
 
     logging.debug(
         'Отправка запроса к API:\n'
-        'URL: {url}\n'
-        'Headers: {headers}\n'
-        'Params: {params}'.format(**request_params)
+        'URL: %(url)s\n'
+        'Headers: %(headers)s\n'
+        'Params: %(params)s\n'
+        'Timeout: %(timeout)s',
+        request_params
     )
 
     try:
@@ -90,6 +140,10 @@ def get_api_answer(timestamp):
             )
         )
 
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        logging.debug('Ответ API не изменился с прошлого запроса')
+        return None, validators
+
     if response.status_code != HTTPStatus.OK:
         raise ValueError(
             'Эндпоинт {url} недоступен. '
@@ -104,7 +158,13 @@ def get_api_answer(timestamp):
         )
 
     logging.debug('Успешный ответ от API')
-    return response.json()
+    response_headers = getattr(response, 'headers', None) or {}
+    received_validators = {
+        request_header: response_headers[response_header]
+        for response_header, request_header in VALIDATOR_HEADERS.items()
+        if response_header in response_headers
+    }
+    return response.json(), received_validators
 
 
 def check_response(response):
@@ -126,11 +186,10 @@ def check_response(response):
             f'получен {type(response).__name__}'
         )
 
-    if 'homeworks' not in response:
+    homeworks = response.get('homeworks', _MISSING)
+    if homeworks is _MISSING:
         raise KeyError('Ключ "homeworks" отсутствует в ответе API')
 
-    homeworks = response['homeworks']
-
     if not isinstance(homeworks, list):
         raise TypeError(
             'homeworks должен быть списком, '
@@ -153,19 +212,127 @@ def parse_status(homework):
         KeyError: Отсутствует обязательный ключ ('homework_name' или 'status')
         ValueError: Неизвестный статус работы
     """
-    if 'homework_name' not in homework:
+    if not isinstance(homework, dict):
+        raise KeyError(
+            'Ключ "homework_name" отсутствует в ответе API: данные работы '
+            f'должны быть словарём, получен {type(homework).__name__}'
+        )
+    homework_name = homework.get('homework_name', _MISSING)
+    if homework_name is _MISSING:
         raise KeyError('Ключ "homework_name" отсутствует в ответе API')
-    if 'status' not in homework:
+    status = homework.get('status', _MISSING)
+    if status is _MISSING:
         raise KeyError('Ключ "status" отсутствует в ответе API')
+    if not isinstance(status, str):
+        raise ValueError(f'Неизвестный статус работы: {status}')
+
+    return _format_status(str(homework_name), status)
 
-    homework_name = homework['homework_name']
-    status = homework['status']
 
-    verdict = HOMEWORK_VERDICTS.get(status)
-    if verdict is None:
+@lru_cache(maxsize=256)
+def _format_status(homework_name, status):
+    """Формирует сообщение о статусе работы с кешированием результата.
+
+    Аргументы должны быть строками: они служат ключом кеша.
+    """
+    formatter = _get_formatter(status)
+    if formatter is None:
         raise ValueError(f'Неизвестный статус работы: {status}')
 
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    return formatter(homework_name)
+
+
+def join_statuses(statuses):
+    """Группирует сообщения о статусах работ для отправки в Telegram.
+
+    Args:
+        statuses: Сообщения о статусах работ
+
+    Returns:
+        list: Группы статусов. Каждая группа отправляется одним сообщением
+        длиной не более MAX_MESSAGE_LENGTH символов, если только она не
+        состоит из единственного более длинного статуса
+    """
+    batches = []
+    length = 0
+    for status in statuses:
+        joined_length = length + len(MESSAGE_SEPARATOR) + len(status)
+        if batches and joined_length <= MAX_MESSAGE_LENGTH:
+            batches[-1].append(status)
+            length = joined_length
+        else:
+            batches.append([status])
+            length = len(status)
+
+    return batches
+
+
+def split_message(message):
+    """Делит сообщение на части длиной не более MAX_MESSAGE_LENGTH символов.
+
+    Args:
+        message: Текст сообщения
+
+    Returns:
+        list: Части сообщения
+    """
+    return [
+        message[start:start + MAX_MESSAGE_LENGTH]
+        for start in range(0, len(message), MAX_MESSAGE_LENGTH)
+    ]
+
+
+def parse_statuses(homeworks):
+    """Извлекает статусы всех домашних работ из ответа API.
+
+    Работа, статус которой не удалось разобрать, не мешает разбору
+    остальных: ошибка возвращается вместе с результатом.
+
+    Args:
+        homeworks: Список домашних работ из ответа API
+
+    Returns:
+        tuple: Словарь сообщений о статусах по названиям работ и список
+        ошибок разбора (KeyError или ValueError)
+    """
+    statuses = {}
+    errors = []
+    for homework in homeworks:
+        try:
+            message = parse_status(homework)
+        except (KeyError, ValueError) as error:
+            errors.append(error)
+            continue
+        statuses[str(homework['homework_name'])] = message
+
+    return statuses, errors
+
+
+def deliver_statuses(bot, statuses, delivered):
+    """Отправляет в Telegram ещё не доставленные статусы домашних работ.
+
+    Args:
+        bot: Объект бота TeleBot
+        statuses: Сообщения о статусах по названиям работ
+        delivered: Последние доставленные сообщения по названиям работ,
+            пополняется после каждой отправленной группы
+
+    Returns:
+        bool: True если доставлены все статусы, False при ошибке отправки
+    """
+    pending = [
+        (name, message) for name, message in statuses.items()
+        if delivered.get(name) != message
+    ]
+    position = 0
+    for batch in join_statuses([message for _, message in pending]):
+        text = MESSAGE_SEPARATOR.join(batch)
+        if not all(send_message(bot, part) for part in split_message(text)):
+            return False
+        delivered.update(pending[position:position + len(batch)])
+        position += len(batch)
+
+    return True
 
 
 def check_tokens():
@@ -174,13 +341,13 @@ def check_tokens():
     Raises:
         MissingTokensError: Если отсутствуют обязательные переменные
     """
-    tokens = {
-        'PRACTICUM_TOKEN': PRACTICUM_TOKEN,
-        'TELEGRAM_TOKEN': TELEGRAM_TOKEN,
-        'TELEGRAM_CHAT_ID': TELEGRAM_CHAT_ID,
-    }
+    tokens = (
+        ('PRACTICUM_TOKEN', PRACTICUM_TOKEN),
+        ('TELEGRAM_TOKEN', TELEGRAM_TOKEN),
+        ('TELEGRAM_CHAT_ID', TELEGRAM_CHAT_ID),
+    )
 
-    missing_tokens = [name for name, value in tokens.items() if not value]
+    missing_tokens = [name for name, value in tokens if not value]
 
     if missing_tokens:
         error_message = (
@@ -191,41 +358,97 @@ def check_tokens():
         raise MissingTokensError(error_message)
 
 
+def report_error(bot, error, last_error_signature):
+    """Логирует сбой и сообщает о нём в Telegram, если о нём ещё не сообщали.
+
+    Args:
+        bot: Объект бота TeleBot
+        error: Исключение, вызвавшее сбой
+        last_error_signature: Сигнатура последнего сбоя, о котором
+            уже сообщено
+
+    Returns:
+        tuple: Сигнатура сбоя: тип исключения и его аргументы
+    """
+    error_signature = (type(error), error.args)
+    if error_signature != last_error_signature:
+        error_message = f'Сбой в работе программы: {error}'
+        logging.error(error_message)
+        _ALERT_EXECUTOR.submit(send_message, bot, error_message)
+    return error_signature
+
+
 def main():
     """Основная логика работы бота."""
     check_tokens()
 
     bot = telebot.TeleBot(TELEGRAM_TOKEN)
     current_timestamp = int(time.time())
-    last_error = None
+    delivered_statuses = {}
+    # Временная метка и заголовки условного запроса из последнего ответа
+    # API, который бот полностью обработал. Пока ответ не обработан,
+    # запрос остаётся безусловным, иначе ответ 304 скрыл бы обновления.
+    validated_timestamp, validators = None, None
+    last_error_signature = None
+    backoff = RETRY_PERIOD
 
     while True:
+        cycle_started = time.monotonic()
+        delay = RETRY_PERIOD
         try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-
-            if homeworks:
-                message = parse_status(homeworks[0])
-                if send_message(bot, message):
-                    current_timestamp = response.get(
-                        'current_date',
-                        current_timestamp
-                    )
-                    last_error = None
-
-        except Exception as error:
-            error_message = f'Сбой в работе программы: {error}'
-            if error_message != last_error:
-                logging.error(error_message)
-                send_message(bot, error_message)
-                last_error = error_message
-
-        time.sleep(RETRY_PERIOD)
+            response, received_validators = get_conditional_api_answer(
+                current_timestamp,
+                validators if validated_timestamp == current_timestamp
+                else None
+            )
+        except (ConnectionError, ValueError) as error:
+            last_error_signature = report_error(
+                bot, error, last_error_signature
+            )
+            # При повторных сбоях API интервал удваивается до
+            # MAX_RETRY_PERIOD, а случайный разброс не даёт ботам
+            # опрашивать API синхронно.
+            backoff = min(MAX_RETRY_PERIOD, backoff * 2)
+            delay = random.uniform(backoff / 2, backoff)
+        else:
+            backoff = RETRY_PERIOD
+            try:
+                homeworks = (
+                    [] if response is None else check_response(response)
+                )
+                if not homeworks:
+                    validated_timestamp = current_timestamp
+                    validators = received_validators
+                else:
+                    statuses, parse_errors = parse_statuses(homeworks)
+                    if deliver_statuses(bot, statuses, delivered_statuses):
+                        current_timestamp = response.get(
+                            'current_date',
+                            current_timestamp
+                        )
+                        delivered_statuses.clear()
+                        last_error_signature = None
+                        # Работы с ошибками разбора пропускаются: о них
+                        # сообщается один раз, а метка всё равно сдвигается.
+                        for error in parse_errors:
+                            last_error_signature = report_error(
+                                bot, error, last_error_signature
+                            )
+            except Exception as error:
+                last_error_signature = report_error(
+                    bot, error, last_error_signature
+                )
+
+        # Время работы цикла вычитается из паузы, чтобы период опроса
+        # не накапливал отставание.
+        elapsed = int(time.monotonic() - cycle_started)
+        delay = max(0, delay - elapsed)
+        time.sleep(delay)
 
 
 if __name__ == '__main__':
     logging.basicConfig(
-        level=logging.DEBUG,
+        level=logging.INFO,
         format='%(asctime)s [%(levelname)s] %(message)s',
         handlers=[logging.StreamHandler(sys.stdout)]
     )
@@ -0,0 +1,419 @@
+import inspect
+import json
+import random
+import threading
+import time
+from http import HTTPStatus
+
+import pytest
+import requests
+import telebot
+
+import tests.check_utils as check_utils
+
+
+class RecordingBot:
+    def __init__(self, *args, **kwargs):
+        self.sent = []
+        self.threads = {}
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append(text)
+        self.threads[text] = threading.current_thread()
+
+
+class FlakyBot(RecordingBot):
+    """Bot raising a Telegram API error on the given send attempts."""
+
+    def __init__(self, fail_calls=(0,), *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fail_calls = set(fail_calls)
+        self.calls = 0
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        call = self.calls
+        self.calls += 1
+        if call in self.fail_calls:
+            raise telebot.apihelper.ApiException(
+                'Произошла ошибка при отправке сообщения в Telegram.',
+                'send_message',
+                500
+            )
+        super().send_message(chat_id, text, **kwargs)
+
+
+def make_etag_api(data, etag='"v1"'):
+    """Build a `requests.get` replacement honouring `If-None-Match`.
+
+    Returns the replacement and the list of headers of every request.
+    """
+    request_headers = []
+
+    def mock_get(url, headers=None, **kwargs):
+        request_headers.append(dict(headers))
+        response = requests.Response()
+        response.headers['ETag'] = etag
+        if headers.get('If-None-Match') == etag:
+            response.status_code = HTTPStatus.NOT_MODIFIED
+        else:
+            response.status_code = HTTPStatus.OK
+            response._content = json.dumps(data).encode()
+        return response
+
+    return mock_get, request_headers
+
+
+def status_of_length(homework_module, length, status='approved'):
+    """Build a homework whose status message has the given length."""
+    homework = {'homework_name': '', 'status': status}
+    overhead = len(homework_module.parse_status(homework))
+    homework['homework_name'] = 'x' * (length - overhead)
+    return homework
+
+
+def patch_api(monkeypatch, homework_module, answers):
+    """Replace the API call in `main()` with the given answers.
+
+    An exception among the answers is raised instead of being returned;
+    the last answer is repeated once the others are used up.
+    """
+    answers = list(answers)
+
+    def mock_get_conditional_api_answer(timestamp, validators):
+        answer = answers.pop(0) if len(answers) > 1 else answers[0]
+        if isinstance(answer, Exception):
+            raise answer
+        return answer, {}
+
+    monkeypatch.setattr(
+        homework_module,
+        'get_conditional_api_answer',
+        mock_get_conditional_api_answer
+    )
+
+
+def run_main(monkeypatch, homework_module, cycles, bot=None):
+    """Run `main()` for the given number of loop cycles.
+
+    Returns the list of delays passed to `time.sleep()`.
+    """
+    bot = bot or RecordingBot()
+    sleeps = []
+
+    def fake_sleep(secs):
+        sleeps.append(secs)
+        if len(sleeps) >= cycles:
+            raise check_utils.BreakInfiniteLoop('break')
+
+    monkeypatch.setattr(telebot, 'TeleBot', lambda *args, **kwargs: bot)
+    monkeypatch.setattr(time, 'sleep', fake_sleep)
+    # Тесты из test_bot.py оборачивают main() в with_timeout.
+    main = inspect.unwrap(homework_module.main)
+    with pytest.raises(check_utils.BreakInfiniteLoop):
+        main()
+    return sleeps
+
+
+class TestBackoff:
+
+    def test_backoff_doubles_caps_and_resets(
+            self, monkeypatch, homework_module
+    ):
+        failure = ConnectionError('API недоступен')
+        success = {'homeworks': [], 'current_date': 1}
+        patch_api(
+            monkeypatch,
+            homework_module,
+            [failure, failure, failure, failure, success, failure]
+        )
+        jitter_bounds = []
+
+        def mock_uniform(low, high):
+            jitter_bounds.append((low, high))
+            return high
+
+        monkeypatch.setattr(random, 'uniform', mock_uniform)
+
+        sleeps = run_main(monkeypatch, homework_module, cycles=6)
+
+        retry_period = homework_module.RETRY_PERIOD
+        max_retry_period = homework_module.MAX_RETRY_PERIOD
+        assert sleeps == [
+            2 * retry_period,
+            4 * retry_period,
+            max_retry_period,
+            max_retry_period,
+            retry_period,
+            2 * retry_period,
+        ], (
+            'Интервал должен удваиваться при сбоях, не превышать '
+            '`MAX_RETRY_PERIOD` и сбрасываться после успешного опроса.'
+        )
+        assert all(low == high / 2 for low, high in jitter_bounds), (
+            'Случайная пауза должна выбираться из второй половины интервала.'
+        )
+
+    def test_processing_errors_do_not_back_off(
+            self, monkeypatch, homework_module
+    ):
+        patch_api(monkeypatch, homework_module, [
+            {'homeworks': 'не список', 'current_date': 1},
+        ])
+
+        sleeps = run_main(monkeypatch, homework_module, cycles=3)
+
+        assert sleeps == [homework_module.RETRY_PERIOD] * 3, (
+            'Интервал должен увеличиваться только при сбоях запроса к API.'
+        )
+
+
+class TestPollingDrift:
+
+    def test_cycle_work_time_is_subtracted_from_pause(
+            self, monkeypatch, homework_module
+    ):
+        patch_api(monkeypatch, homework_module, [
+            {'homeworks': [], 'current_date': 1},
+        ])
+        # Начало и конец каждого цикла: 1.7 с работы, затем 700 с.
+        clock = iter([0.0, 1.7, 10.0, 710.0])
+        monkeypatch.setattr(time, 'monotonic', lambda: next(clock))
+
+        sleeps = run_main(monkeypatch, homework_module, cycles=2)
+
+        retry_period = homework_module.RETRY_PERIOD
+        assert sleeps == [retry_period - 1, 0], (
+            'Из паузы вычитается целое число секунд работы цикла, '
+            'пауза не бывает отрицательной.'
+        )
+
+
+class TestConditionalRequests:
+
+    def test_unchanged_response_is_requested_conditionally(
+            self, monkeypatch, homework_module
+    ):
+        mock_get, request_headers = make_etag_api(
+            {'homeworks': [], 'current_date': 1}
+        )
+        monkeypatch.setattr(requests, 'get', mock_get)
+
+        run_main(monkeypatch, homework_module, cycles=2)
+
+        assert 'If-None-Match' not in request_headers[0]
+        assert request_headers[1]['If-None-Match'] == '"v1"', (
+            'Повторный запрос без изменений должен передавать ETag '
+            'прошлого ответа в `If-None-Match`.'
+        )
+
+    def test_undelivered_status_is_not_hidden_by_not_modified(
+            self, monkeypatch, homework_module
+    ):
+        homework = {'homework_name': 'hw1.zip', 'status': 'approved'}
+        mock_get, request_headers = make_etag_api(
+            {'homeworks': [homework], 'current_date': 1}
+        )
+        monkeypatch.setattr(requests, 'get', mock_get)
+        bot = FlakyBot()
+
+        run_main(monkeypatch, homework_module, cycles=2, bot=bot)
+
+        assert 'If-None-Match' not in request_headers[1], (
+            'После неудачной отправки статуса ответ API не должен '
+            'считаться обработанным.'
+        )
+        assert bot.sent == [homework_module.parse_status(homework)], (
+            'Статус, который не удалось отправить, должен быть '
+            'отправлен при следующем опросе.'
+        )
+
+
+class TestTelegramSends:
+
+    def test_status_is_not_queued_behind_error_alert(
+            self, monkeypatch, homework_module
+    ):
+        homework = {'homework_name': 'hw1.zip', 'status': 'approved'}
+        patch_api(monkeypatch, homework_module, [
+            ConnectionError('API недоступен'),
+            {'homeworks': [homework], 'current_date': 1},
+        ])
+        alert_sent = threading.Event()
+        release_alert = threading.Event()
+
+        class SlowAlertBot(RecordingBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if text.startswith('Сбой в работе программы'):
+                    alert_sent.set()
+                    release_alert.wait(1)
+                super().send_message(chat_id, text, **kwargs)
+
+        bot = SlowAlertBot()
+        try:
+            run_main(monkeypatch, homework_module, cycles=2, bot=bot)
+        finally:
+            release_alert.set()
+
+        assert alert_sent.wait(1)
+        status = homework_module.parse_status(homework)
+        assert bot.threads[status] is threading.main_thread(), (
+            'Статус работы должен отправляться без ожидания оповещений '
+            'об ошибках.'
+        )
+
+    def test_repeated_error_is_alerted_once(
+            self, monkeypatch, homework_module
+    ):
+        patch_api(monkeypatch, homework_module, [
+            ConnectionError('API недоступен'),
+            ConnectionError('API недоступен'),
+            ConnectionError('Нет соединения'),
+            ValueError('Нет соединения'),
+        ])
+        monkeypatch.setattr(random, 'uniform', lambda low, high: high)
+        bot = RecordingBot()
+
+        run_main(monkeypatch, homework_module, cycles=4, bot=bot)
+        homework_module._ALERT_EXECUTOR.submit(lambda: None).result()
+
+        assert bot.sent == [
+            'Сбой в работе программы: API недоступен',
+            'Сбой в работе программы: Нет соединения',
+            'Сбой в работе программы: Нет соединения',
+        ], (
+            'Повторный сбой с тем же типом и аргументами не должен '
+            'отправляться снова, а другой сбой должен.'
+        )
+
+
+class TestParseStatus:
+
+    def test_unhashable_values_are_handled(self, homework_module):
+        homework = {'homework_name': ['hw1.zip'], 'status': 'approved'}
+
+        assert homework_module.parse_status(homework).startswith(
+            "Изменился статус проверки работы \"['hw1.zip']\""
+        )
+
+        homework = {'homework_name': 'hw1.zip', 'status': ['approved']}
+        with pytest.raises(ValueError):
+            homework_module.parse_status(homework)
+
+
+class TestJoinStatuses:
+
+    def test_statuses_are_joined_into_one_message(self, homework_module):
+        statuses = ['первый', 'второй', 'третий']
+
+        assert homework_module.join_statuses(statuses) == [statuses]
+
+    def test_statuses_are_split_at_message_limit(self, homework_module):
+        limit = homework_module.MAX_MESSAGE_LENGTH
+        separator = homework_module.MESSAGE_SEPARATOR
+        first = 'a' * (limit - len(separator) - 1)
+        second = 'b'
+        third = 'c'
+
+        batches = homework_module.join_statuses([first, second, third])
+
+        assert batches == [[first, second], [third]], (
+            'Сообщение должно заполняться статусами ровно до '
+            '`MAX_MESSAGE_LENGTH` символов.'
+        )
+        assert len(separator.join(batches[0])) == limit
+
+    def test_long_status_is_sent_in_parts(self, homework_module):
+        limit = homework_module.MAX_MESSAGE_LENGTH
+        status = 'a' * (2 * limit + 10)
+
+        batches = homework_module.join_statuses(['b', status, 'c'])
+        parts = homework_module.split_message(status)
+
+        assert batches == [['b'], [status], ['c']]
+        assert [len(part) for part in parts] == [limit, limit, 10]
+        assert ''.join(parts) == status
+
+
+class TestDeliverStatuses:
+
+    def test_delivered_batch_is_not_resent(
+            self, monkeypatch, homework_module
+    ):
+        limit = homework_module.MAX_MESSAGE_LENGTH
+        homeworks = [
+            status_of_length(homework_module, limit // 2 + 10),
+            status_of_length(homework_module, limit // 2 + 20),
+        ]
+        patch_api(monkeypatch, homework_module, [
+            {'homeworks': homeworks, 'current_date': 1},
+        ])
+        bot = FlakyBot(fail_calls=(1,))
+
+        run_main(monkeypatch, homework_module, cycles=2, bot=bot)
+
+        assert bot.sent == [
+            homework_module.parse_status(homework) for homework in homeworks
+        ], (
+            'Уже доставленная часть статусов не должна отправляться '
+            'повторно, а недоставленная должна быть отправлена при '
+            'следующем опросе.'
+        )
+
+    def test_unknown_status_is_reported_once_and_skipped(
+            self, monkeypatch, homework_module
+    ):
+        valid = {'homework_name': 'hw1.zip', 'status': 'approved'}
+        unknown = {'homework_name': 'hw2.zip', 'status': 'unknown'}
+        patch_api(monkeypatch, homework_module, [
+            {'homeworks': [unknown, valid], 'current_date': 1},
+            {'homeworks': [], 'current_date': 1},
+        ])
+        bot = RecordingBot()
+
+        sleeps = run_main(monkeypatch, homework_module, cycles=3, bot=bot)
+        homework_module._ALERT_EXECUTOR.submit(lambda: None).result()
+
+        status = homework_module.parse_status(valid)
+        alerts = [text for text in bot.sent if 'unknown' in text]
+        assert bot.sent.count(status) == 1, (
+            'Работа с неизвестным статусом не должна мешать отправке '
+            'остальных статусов.'
+        )
+        assert len(alerts) == 1, (
+            'О работе с неизвестным статусом нужно сообщить один раз.'
+        )
+        assert sleeps == [homework_module.RETRY_PERIOD] * 3
+
+    @pytest.mark.parametrize('junk', ['junk', ['hw2.zip', 'approved']])
+    def test_non_dict_homework_does_not_block_others(
+            self, junk, homework_module
+    ):
+        valid = {'homework_name': 'hw1.zip', 'status': 'approved'}
+
+        statuses, errors = homework_module.parse_statuses([junk, valid])
+
+        assert statuses == {'hw1.zip': homework_module.parse_status(valid)}, (
+            'Работа, данные которой не являются словарём, не должна '
+            'мешать разбору остальных статусов.'
+        )
+        assert [type(error) for error in errors] == [KeyError]
+
+    def test_returning_status_is_sent_again(self, homework_module):
+        bot = RecordingBot()
+        delivered = {}
+        messages = [
+            homework_module.parse_status(
+                {'homework_name': 'hw1.zip', 'status': status}
+            )
+            for status in ('reviewing', 'rejected', 'reviewing', 'reviewing')
+        ]
+
+        for message in messages:
+            homework_module.deliver_statuses(
+                bot, {'hw1.zip': message}, delivered
+            )
+
+        assert bot.sent == messages[:3], (
+            'Статус, к которому вернулась работа, должен быть отправлен '
+            'снова, а неизменившийся статус — нет.'
+        )